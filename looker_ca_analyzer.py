@@ -1,19 +1,30 @@
 from google.cloud import secretmanager
 import os
+import hmac
+import asyncio
+import threading
+import functools
 import looker_sdk
 import configparser
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, FinishReason
 import vertexai.preview.generative_models as generative_models
 import sys
-import json
+import orjson
 import time
-import collections
 import typing
 import textwrap
 import re
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import io
+import cachetools
+from aiolimiter import AsyncLimiter
+from google.api_core.exceptions import ResourceExhausted, ServerError
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+import pandas as pd
+from datetime import timedelta
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors, cors_exempt
+from quart_rate_limiter import RateLimiter, rate_limit
 
 # Configuration constants
 LOOKER_PROJECT_ID = "joey-looker"
@@ -21,11 +32,25 @@ LOOKER_SECRET_NAME = "looker_ini"
 LOOKER_SECRET_VERSION = "latest"
 VERTEX_PROJECT_ID = "joey-looker"
 VERTEX_LOCATION = "us-central1"
+VERTEX_FALLBACK_LOCATIONS = ["us-east4", "europe-west4"]  # Tried in order when VERTEX_LOCATION is out of quota
+GEMINI_MAX_ATTEMPTS = 4
 GEMINI_MODEL_NAME = "gemini-2.5-flash-preview-04-17"
 API_CALL_DELAY = 1
 TOP_N_FIELDS = 15
 AGENT_INSTRUCTION_TOP_FIELDS = 5
 CA_SUFFIX = "_ca"
+MAX_RECOMMENDATIONS = 7
+MAX_WEIGHTED_FIELDS = 10
+HISTORY_CACHE_TTL_SECONDS = 1800
+ADMIN_TOKEN = os.environ.get("ANALYZER_ADMIN_TOKEN")  # Admin endpoints are disabled when unset
+
+# Rate limits protecting Vertex AI quota and cost. These limits, and the history cache,
+# live in process memory: with several server workers each worker enforces them separately.
+RATE_LIMIT_PERIOD = timedelta(hours=1)
+ANALYZE_RATE_LIMIT = 60               # Per client per period, on /analyze
+GENERATE_RATE_LIMIT = 30              # Per client per period, on LookML generation endpoints
+ADMIN_RATE_LIMIT = 10                 # Per client per period, on admin endpoints
+GEMINI_TOKENS_PER_MINUTE = 4_000_000  # Per-process estimated prompt tokens sent to Gemini
 
 # Source weights for different query types
 SOURCE_WEIGHTS = {
@@ -43,6 +68,37 @@ SOURCE_WEIGHTS = {
 }
 DEFAULT_WEIGHT = 0.5
 
+# orjson is used for all JSON encoding/decoding on the request path
+_loads = orjson.loads
+
+def _dumps(obj, option=None):
+    """Serializes obj to a JSON string."""
+    return orjson.dumps(obj, option=option).decode()
+
+# Background event loop used to run async work (Gemini calls, concurrent Looker
+# fetches) from synchronous callers such as main.py. The Quart app awaits the
+# same coroutines directly on its own loop.
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+def _get_event_loop():
+    """Returns the shared background event loop, starting it on first use."""
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, daemon=True).start()
+    return _event_loop
+
+def run_async(coro):
+    """Runs a coroutine on the background event loop and blocks until it completes.
+
+    A single long-lived loop is used (rather than asyncio.run per call) because the
+    Vertex AI async client binds to the loop it was first used on.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+@functools.lru_cache(maxsize=None)
 def get_looker_config_from_secret_manager(project_id, secret_name, version):
     """Fetches Looker config from Secret Manager."""
     client = secretmanager.SecretManagerServiceClient()
@@ -69,26 +125,42 @@ def initialize_looker_sdk(config):
     sdk = looker_sdk.init40()
     return sdk
 
-def initialize_vertex_ai(project_id, location):
+def initialize_vertex_ai(project_id, location, system_instruction=None):
     """Initializes Vertex AI."""
     vertexai.init(project=project_id, location=location)
-    return GenerativeModel(GEMINI_MODEL_NAME)
-
-def generate_gemini_prompt(model_name, explore_name, explore_lookml_json):
-    """Generates a prompt for Gemini to analyze LookML explore definition for CA readiness."""
-    prompt = f"""
+    return GenerativeModel(GEMINI_MODEL_NAME, system_instruction=system_instruction)
+
+# Process-wide clients, created once on first use and reused across requests
+_sdk = None
+_gemini_models = {}  # Keyed by (Vertex AI location, system instruction)
+# Separate locks so a Gemini model lookup never waits behind the Looker login
+_sdk_lock = threading.Lock()
+_gemini_lock = threading.Lock()
+
+def _get_sdk():
+    """Returns the shared Looker SDK, initializing it from Secret Manager on first use."""
+    global _sdk
+    with _sdk_lock:
+        if _sdk is None:
+            looker_config = get_looker_config_from_secret_manager(
+                LOOKER_PROJECT_ID, LOOKER_SECRET_NAME, LOOKER_SECRET_VERSION
+            )
+            _sdk = initialize_looker_sdk(looker_config)
+    return _sdk
+
+def _get_gemini_model(location=VERTEX_LOCATION, system_instruction=None):
+    """Returns the shared Gemini model for a location, initializing Vertex AI on first use."""
+    key = (location, system_instruction)
+    with _gemini_lock:
+        if key not in _gemini_models:
+            _gemini_models[key] = initialize_vertex_ai(VERTEX_PROJECT_ID, location, system_instruction)
+    return _gemini_models[key]
+
+# Fixed instructions for the readiness analysis, sent once as the model's system instruction
+# so that each /analyze prompt only carries the explore being analyzed
+ANALYSIS_SYSTEM_INSTRUCTION = """
 You are an expert LookML developer optimizing Looker Explores specifically for Looker's Conversational Analytics feature (Gemini in Looker). This feature translates natural language questions into Looker API queries based on LookML metadata (fields, labels, descriptions) and data values. Your goal is to evaluate the provided Explore definition for CA readiness and suggest actionable improvements based on CA best practices.
 
-**Analyze the following LookML Explore definition:**
-
-* **Model:** `{model_name}`
-* **Explore:** `{explore_name}`
-
-**Explore Definition (JSON representation from Looker SDK):**
-```json
-{explore_lookml_json}
-```
-
 **Analysis Task:**
 
 Evaluate the readiness of this Explore for Conversational Analytics, focusing on common pitfalls and best practices:
@@ -125,32 +197,82 @@ Provide a numbered list of specific, actionable recommendations focused on impro
 
 ### GENERATED LOOKML SUGGESTIONS
 Provide 1-2 concise LookML code snippets demonstrating *how* to implement a key recommendation, focusing on adding descriptions or labels.
+"""
+
+def generate_gemini_prompt(model_name, explore_name, explore_lookml_json):
+    """Generates a prompt for Gemini to analyze LookML explore definition for CA readiness."""
+    prompt = f"""Model: `{model_name}`
+Explore: `{explore_name}`
+
+Explore definition (JSON; keys that are unset are omitted):
+```json
+{explore_lookml_json}
+```
 """
     return prompt
 
-def analyze_with_gemini(model, prompt, model_name, explore_name):
+# Matches each "### <HEADER>" section of the analysis requested by generate_gemini_prompt
+_ANALYSIS_SECTION_RE = re.compile(
+    r'^###\s*(GRADE|RATIONALE|RECOMMENDATIONS|GENERATED LOOKML SUGGESTIONS)[ \t]*\n(.*?)(?=^###|\Z)',
+    re.S | re.M
+)
+
+_gemini_token_limiter = AsyncLimiter(GEMINI_TOKENS_PER_MINUTE, 60)
+
+async def _acquire_gemini_capacity(prompt, system_instruction=None):
+    """Waits until the token-per-minute budget allows sending the prompt to Gemini."""
+    # Roughly 4 characters per token
+    prompt_chars = len(prompt) + len(system_instruction or "")
+    estimated_tokens = min(max(prompt_chars // 4, 1), GEMINI_TOKENS_PER_MINUTE)
+    await _gemini_token_limiter.acquire(estimated_tokens)
+
+# Generation config and safety settings used for all Gemini calls
+_GEN_CONFIG = generative_models.GenerationConfig(
+    max_output_tokens=8192,
+    temperature=0.2,
+    top_p=0.95,
+    top_k=40
+)
+_SAFETY = {
+    generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+}
+
+async def _generate_content_with_retry(model, prompt, stream, system_instruction=None):
+    """Calls generate_content_async, retrying transient Vertex AI failures with exponential backoff.
+
+    When quota is exhausted, the next attempt goes to the next fallback region.
+    system_instruction must match the one the model was created with.
+    """
+    locations = [VERTEX_LOCATION] + VERTEX_FALLBACK_LOCATIONS
+    location_index = 0
+
+    # Charge the token budget once per request; failed attempts consume no Gemini quota
+    await _acquire_gemini_capacity(prompt, system_instruction)
+    async for attempt in AsyncRetrying(
+        wait=wait_exponential(multiplier=1, max=16),
+        stop=stop_after_attempt(GEMINI_MAX_ATTEMPTS),
+        retry=retry_if_exception_type((ServerError, ResourceExhausted)),
+        reraise=True,
+    ):
+        with attempt:
+            return await model.generate_content_async(
+                [prompt],
+                generation_config=_GEN_CONFIG,
+                safety_settings=_SAFETY,
+                stream=stream,
+            )
+        if isinstance(attempt.retry_state.outcome.exception(), ResourceExhausted):
+            location_index = (location_index + 1) % len(locations)
+            print(f"Gemini quota exhausted, retrying in {locations[location_index]}...")
+            model = await asyncio.to_thread(_get_gemini_model, locations[location_index], system_instruction)
+
+async def analyze_with_gemini(model, prompt, model_name, explore_name, system_instruction=None):
     """Sends a prompt to the Gemini model and returns the response text."""
     try:
-        # Configure safety settings and generation parameters
-        generation_config = generative_models.GenerationConfig(
-            max_output_tokens=8192,
-            temperature=0.2,
-            top_p=0.95,
-            top_k=40
-        )
-        safety_settings = {
-            generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-            generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        }
-
-        response = model.generate_content(
-            [prompt],
-            generation_config=generation_config,
-            safety_settings=safety_settings,
-            stream=False,
-        )
+        response = await _generate_content_with_retry(model, prompt, stream=False, system_instruction=system_instruction)
 
         if not response.candidates:
             return "Error: No response candidates returned by Gemini."
@@ -177,13 +299,67 @@ def analyze_with_gemini(model, prompt, model_name, explore_name):
     except Exception as e:
         return f"Error: Unexpected error during Gemini analysis: {str(e)}"
 
-def fetch_and_process_history(sdk, weights: dict, default_weight: float):
+async def analyze_with_gemini_stream(model, prompt, model_name, explore_name):
+    """Sends a prompt to the Gemini model and yields the response text as it is generated."""
+    try:
+        # Only establishing the stream is retried; chunks already sent cannot be replayed
+        responses = await _generate_content_with_retry(model, prompt, stream=True)
+
+        finish_reason = None
+        async for response in responses:
+            if not response.candidates:
+                continue
+            candidate = response.candidates[0]
+            if candidate.content and candidate.content.parts:
+                yield candidate.content.parts[0].text
+            finish_reason = candidate.finish_reason
+
+        if finish_reason is None:
+            yield "Error: No response candidates returned by Gemini."
+        elif finish_reason == FinishReason.SAFETY:
+            yield "\n\nError: Gemini response blocked due to safety filters."
+        elif finish_reason == FinishReason.MAX_TOKENS:
+            yield "\n\nWarning: Response truncated (MAX_TOKENS). Output might be incomplete."
+        elif finish_reason != FinishReason.STOP:
+            yield f"\n\nError: Gemini generation stopped unexpectedly ({finish_reason.name})."
+
+    except Exception as e:
+        yield f"\n\nError: Unexpected error during Gemini analysis: {str(e)}"
+
+# Weighted field usage changes slowly, so it is cached rather than re-queried per request
+_history_cache = cachetools.TTLCache(maxsize=256, ttl=HISTORY_CACHE_TTL_SECONDS)
+_history_cache_lock = threading.Lock()
+
+def fetch_and_process_history(sdk, weights: dict, default_weight: float, model_name: str = None, explore_name: str = None):
+    """Returns weighted field usage, served from a TTL cache when available.
+
+    When model_name/explore_name are given, only history for that explore is fetched.
+    """
+    cache_key = (frozenset(weights.items()), default_weight, model_name, explore_name)
+    with _history_cache_lock:
+        usage_scores = _history_cache.get(cache_key)
+    if usage_scores is not None:
+        print("Using cached history data.")
+        return usage_scores
+
+    usage_scores = _fetch_and_process_history(sdk, weights, default_weight, model_name, explore_name)
+    if usage_scores is not None:
+        with _history_cache_lock:
+            _history_cache[cache_key] = usage_scores
+    return usage_scores
+
+def clear_history_cache():
+    """Drops all cached history data so the next request refetches it."""
+    with _history_cache_lock:
+        _history_cache.clear()
+
+def _fetch_and_process_history(sdk, weights: dict, default_weight: float, model_name: str = None, explore_name: str = None):
     """Fetches Looker history data via API and processes it to calculate weighted field usage."""
     print("Fetching and processing history data via Looker API...")
 
     # Define the parameters for the inline query based on the provided URL
-    model_name = "system__activity"
-    explore_name = "history" # Use explore name as 'view' for run_inline_query
+    activity_model_name = "system__activity"
+    activity_explore_name = "history" # Use explore name as 'view' for run_inline_query
     fields = [
         "query.view",             # Explore name used in the query
         "history.query_run_count",# Number of times the query ran
@@ -199,81 +375,103 @@ def fetch_and_process_history(sdk, weights: dict, default_weight: float):
     sorts = ["history.query_run_count desc"] # Sort by run count descending
     limit = "5000" # API expects limit as string
 
+    # Narrow to a single explore server-side when one is requested
+    if model_name:
+        filters["query.model"] = model_name
+    if explore_name:
+        filters["query.view"] = explore_name
+    if model_name or explore_name:
+        limit = "1000"
+
     # Construct the query body as a dictionary
     query_body_dict = {
-        "model": model_name,
-        "view": explore_name,
+        "model": activity_model_name,
+        "view": activity_explore_name,
         "fields": fields,
         "filters": filters,
         "sorts": sorts,
         "limit": limit
     }
 
-    # Execute the inline query
+    # Execute the inline query. CSV is parsed far faster than JSON; its header row
+    # holds field labels, so columns are renamed to the requested field names.
     try:
-        print(f"Running inline query on {model_name}/{explore_name}...")
-        response_json_str = sdk.run_inline_query(result_format="json", body=query_body_dict)
-        history_data = json.loads(response_json_str)
-        print(f"Successfully fetched {len(history_data)} history records via API.")
+        print(f"Running inline query on {activity_model_name}/{activity_explore_name}...")
+        response_csv_str = sdk.run_inline_query(result_format="csv", body=query_body_dict)
+        history_df = pd.read_csv(
+            io.StringIO(response_csv_str),
+            header=0,
+            names=fields,
+            dtype={"query.model": str, "query.view": str, "query.fields": str, "history.source": str}
+        )
+        print(f"Successfully fetched {len(history_df)} history records via API.")
     except Exception as e:
         print(f"ERROR: Failed to fetch history data: {e}")
         return None
 
     # Process the fetched data
-    usage_scores = collections.defaultdict(lambda: collections.defaultdict(lambda: collections.defaultdict(float)))
-    processed_records = 0
-    skipped_records = 0
-
-    for record in history_data:
-        processed_records += 1
-        model = record.get("query.model")
-        explore = record.get("query.view")
-        fields_str = record.get("query.fields")
-        source = record.get("history.source")
-        run_count = record.get("history.query_run_count", 0)
-        user_count = record.get("user.count", 0)
-
-        if not model or not explore or run_count == 0 or user_count == 0:
-            skipped_records += 1
-            continue
-
-        # Parse fields list
-        try:
-            fields_list = json.loads(fields_str) if isinstance(fields_str, str) else fields_str
-            if not isinstance(fields_list, list):
-                skipped_records += 1
-                continue
-        except:
-            skipped_records += 1
-            continue
-
-        # Calculate weighted score
-        weight = weights.get(source, default_weight) if source else default_weight
-        query_score = float(run_count) * float(user_count) * weight
+    processed_records = len(history_df)
+
+    run_counts = pd.to_numeric(history_df["history.query_run_count"], errors="coerce").fillna(0)
+    user_counts = pd.to_numeric(history_df["user.count"], errors="coerce").fillna(0)
+    # Drop rows that cannot score before touching query.fields, so the string work below
+    # only runs on rows that will be kept
+    valid = (
+        history_df["query.model"].fillna("").astype(bool)
+        & history_df["query.view"].fillna("").astype(bool)
+        & (run_counts != 0)
+        & (user_counts != 0)
+    )
+    # query.fields arrives as a JSON array string, e.g. ["orders.id","users.name"]
+    fields_str = history_df.loc[valid, "query.fields"].fillna("").str.strip()
+    well_formed = fields_str.str.startswith("[") & fields_str.str.endswith("]")
+    fields_str = fields_str[well_formed]
+    valid = valid & well_formed.reindex(valid.index, fill_value=False)
+    history_df = history_df[valid].assign(
+        **{"query.fields": fields_str.str.slice(1, -1).str.replace('"', '', regex=False).str.split(",")}
+    )
+    skipped_records = processed_records - len(history_df)
 
-        # Add score to each field
-        for field in fields_list:
-            if isinstance(field, str) and field:
-                usage_scores[model][explore][field] += query_score
+    # Calculate weighted score per query, then spread it over the query's fields
+    weight = history_df["history.source"].map(weights).fillna(default_weight)
+    history_df = history_df.assign(score=run_counts[valid] * user_counts[valid] * weight)
+    field_usage = history_df.explode("query.fields")
+    field_usage = field_usage.assign(**{"query.fields": field_usage["query.fields"].str.strip()})
+    field_usage = field_usage[field_usage["query.fields"] != ""]
+    field_scores = field_usage.groupby(["query.model", "query.view", "query.fields"])["score"].sum()
 
     print(f"Processed {processed_records} records ({skipped_records} skipped)")
+    # Scores are accumulated on flat (model, explore, field) keys; nest them only once here,
+    # as plain dicts so the cached value is picklable and safe to share
+    usage_scores = {}
+    for (model, explore, field), score in field_scores.to_dict().items():
+        usage_scores.setdefault(model, {}).setdefault(explore, {})[field] = score
     return usage_scores
 
-def generate_synonyms(field_part: str, label: str) -> list:
+# Field name parts that carry no meaning as synonyms
+_SYNONYM_STOPWORDS = frozenset({
+    'id', 'pk', 'fk', 'key', 'date', 'time', 'ts', 'at',
+    'count', 'sum', 'avg', 'min', 'max', 'p50', 'p90', 'p99'
+})
+_NON_WORD_RE = re.compile(r'[^\w]')
+
+@functools.lru_cache(maxsize=4096)
+def generate_synonyms(field_part: str, label: str) -> frozenset:
     """Generates potential synonyms based on field name and label."""
     words = set()
     # Split field name by underscore
     for word in field_part.split('_'):
-        if len(word) > 2 and word not in ['id', 'pk', 'fk', 'key', 'date', 'time', 'ts', 'at', 'count', 'sum', 'avg', 'min', 'max', 'p50', 'p90', 'p99']:
+        if len(word) > 2 and word not in _SYNONYM_STOPWORDS:
             words.add(word.lower())
     # Split label by space
     if label:
         for word in label.split(' '):
-            cleaned_word = re.sub(r'[^\w]', '', word)
+            cleaned_word = _NON_WORD_RE.sub('', word)
             if len(cleaned_word) > 2:
                 words.add(cleaned_word.lower())
 
-    return sorted(list(words))
+    # Cached results are shared between callers, so return an immutable set
+    return frozenset(words)
 
 def generate_agent_instructions(top_used_fields: list, recommendations: list, user_description: str = None, common_questions: str = None, user_goals: str = None) -> list:
     """Generates suggested agent instructions based on analysis results and user input."""
@@ -296,33 +494,42 @@ def generate_agent_instructions(top_used_fields: list, recommendations: list, us
 
     return instructions
 
+_CA_LOOKML_HEADER_TMPL = '''# LookML File for CA-Optimized Explore: {explore_key}
+# Generated by Conversational Readiness Analyzer
+#
+# Purpose: This file defines extended Views and a new Explore based on
+#          '{explore_name}', curated for Conversational Analytics (CA).
+#
+# Instructions:
+# 1. Save this file in your LookML project
+# 2. Replace 'CONNECTION_NAME_PLACEHOLDER' with your actual connection name
+# 3. Verify the 'include:' paths point correctly to your original view files
+# 4. Review and refine the auto-generated labels and descriptions
+
+connection: "CONNECTION_NAME_PLACEHOLDER"'''
+
+def _ca_join_snippet(join, indent="  "):
+    """Builds the LookML join block for a CA-extended joined view."""
+    join_view = join['name']
+    parts = [
+        f"\n{indent}join: {join_view}{CA_SUFFIX} {{",
+        f"{indent}{indent}from: {join_view}{CA_SUFFIX}",
+    ]
+    if join.get('type'): parts.append(f"{indent}{indent}type: {join['type']}")
+    if join.get('relationship'): parts.append(f"{indent}{indent}relationship: {join['relationship']}")
+    if join.get('sql_on'): parts.append(f"{indent}{indent}sql_on: {join['sql_on']} ;;")
+    parts.append(f"{indent}}}")
+    return "\n".join(parts)
+
 def generate_ca_lookml_file_content(explore_key: str, parsed_data: dict, explore_definition_json: str) -> str:
     """Generates the content for a LookML file containing CA-specific extended views and explore."""
     model_name, explore_name = explore_key.split('/', 1)
-    lines = []
     indent = "  "
     ca_explore_name = explore_name + CA_SUFFIX
 
-    # Header Comments
-    lines.append(f"# LookML File for CA-Optimized Explore: {explore_key}")
-    lines.append(f"# Generated by Conversational Readiness Analyzer")
-    lines.append("#")
-    lines.append("# Purpose: This file defines extended Views and a new Explore based on")
-    lines.append(f"#          '{explore_name}', curated for Conversational Analytics (CA).")
-    lines.append("#")
-    lines.append("# Instructions:")
-    lines.append("# 1. Save this file in your LookML project")
-    lines.append("# 2. Replace 'CONNECTION_NAME_PLACEHOLDER' with your actual connection name")
-    lines.append("# 3. Verify the 'include:' paths point correctly to your original view files")
-    lines.append("# 4. Review and refine the auto-generated labels and descriptions")
-    lines.append("")
-
-    # Basic Configuration
-    lines.append('connection: "CONNECTION_NAME_PLACEHOLDER"')
-    
     # Parse explore definition
     try:
-        explore_def = json.loads(explore_definition_json)
+        explore_def = _loads(explore_definition_json)
         base_view = explore_def.get('view_name')
         joins = explore_def.get('joins', [])
     except:
@@ -330,77 +537,84 @@ def generate_ca_lookml_file_content(explore_key: str, parsed_data: dict, explore
         base_view = None
         joins = []
 
-    # Extended Views
-    if base_view:
-        lines.append(f"\nview: {base_view}{CA_SUFFIX} extends: [{base_view}] {{")
-        lines.append(f"{indent}# Add CA-specific refinements here")
-        lines.append("}")
+    parts = [_CA_LOOKML_HEADER_TMPL.format(explore_key=explore_key, explore_name=explore_name)]
 
-    # Extended Explore
-    lines.append(f"\nexplore: {ca_explore_name} {{")
+    # Extended View and Explore
     if base_view:
-        lines.append(f"{indent}from: {base_view}{CA_SUFFIX}")
-    
-    # Add joins
-    for join in joins:
-        join_view = join.get('name')
-        if join_view:
-            lines.append(f"\n{indent}join: {join_view}{CA_SUFFIX} {{")
-            lines.append(f"{indent}{indent}from: {join_view}{CA_SUFFIX}")
-            if join.get('type'): lines.append(f"{indent}{indent}type: {join['type']}")
-            if join.get('relationship'): lines.append(f"{indent}{indent}relationship: {join['relationship']}")
-            if join.get('sql_on'): lines.append(f"{indent}{indent}sql_on: {join['sql_on']} ;;")
-            lines.append(f"{indent}}}")
-
-    lines.append("}")
-
-    return "\n".join(lines)
+        parts.append(
+            f"\nview: {base_view}{CA_SUFFIX} extends: [{base_view}] {{\n"
+            f"{indent}# Add CA-specific refinements here\n"
+            "}"
+        )
+    parts.append(f"\nexplore: {ca_explore_name} {{")
+    if base_view:
+        parts.append(f"{indent}from: {base_view}{CA_SUFFIX}")
+    parts.extend(_ca_join_snippet(join, indent) for join in joins if join.get('name'))
+    parts.append("}")
+
+    return "\n".join(parts)
+
+def _compact(d):
+    """Drops unset (None, False or empty) values from a dict bound for a Gemini prompt."""
+    return {k: v for k, v in d.items() if v}
+
+def _slim_field(field):
+    """Returns the attributes of an explore field that matter for CA readiness."""
+    return _compact({
+        "name": field.name,
+        "label": field.label,
+        "description": field.description,
+        "type": field.type,
+        "hidden": field.hidden
+    })
 
-def analyze_lookml(explore_name, model_name=None, user_description=None, common_questions=None, user_goals=None):
-    """Main function to analyze LookML for CA readiness."""
+async def analyze_lookml_async(explore_name, model_name=None, user_description=None, common_questions=None, user_goals=None):
+    """Main coroutine to analyze LookML for CA readiness."""
     try:
         # Initialize services
-        looker_config = get_looker_config_from_secret_manager(
-            LOOKER_PROJECT_ID, LOOKER_SECRET_NAME, LOOKER_SECRET_VERSION
+        sdk, gemini_model = await asyncio.gather(
+            asyncio.to_thread(_get_sdk),
+            asyncio.to_thread(_get_gemini_model, system_instruction=ANALYSIS_SYSTEM_INSTRUCTION)
         )
-        sdk = initialize_looker_sdk(looker_config)
-        gemini_model = initialize_vertex_ai(VERTEX_PROJECT_ID, VERTEX_LOCATION)
         
-        # Get explore details
-        explore_details = sdk.lookml_model_explore(
-            lookml_model_name=model_name,
-            explore_name=explore_name,
-            fields="name,label,description,hidden,group_label,view_name,joins,fields"
+        # Get explore details and field usage history concurrently
+        explore_details, history_scores = await asyncio.gather(
+            asyncio.to_thread(
+                sdk.lookml_model_explore,
+                lookml_model_name=model_name,
+                explore_name=explore_name,
+                fields="name,label,description,hidden,group_label,view_name,joins,fields"
+            ),
+            asyncio.to_thread(fetch_and_process_history, sdk, SOURCE_WEIGHTS, DEFAULT_WEIGHT, model_name, explore_name)
         )
         
-        # Convert explore_details to a dictionary before serializing
-        explore_dict = {
+        # Convert explore_details to a compact dictionary before serializing; it is sent
+        # to Gemini, so only the attributes the analysis looks at are kept
+        explore_dict = _compact({
             "name": explore_details.name,
             "label": explore_details.label,
             "description": explore_details.description,
             "hidden": explore_details.hidden,
             "group_label": explore_details.group_label,
             "view_name": explore_details.view_name,
-            "joins": [{"name": j.name, "type": j.type, "relationship": j.relationship, "sql_on": j.sql_on, "from": getattr(j, 'from_', None)} for j in explore_details.joins] if explore_details.joins else [],
-            "fields": {
-                "dimensions": [{"name": f.name, "label": f.label, "description": f.description} for f in explore_details.fields.dimensions] if explore_details.fields.dimensions else [],
-                "measures": [{"name": f.name, "label": f.label, "description": f.description} for f in explore_details.fields.measures] if explore_details.fields.measures else [],
-                "filters": [{"name": f.name, "label": f.label, "description": f.description} for f in explore_details.fields.filters] if explore_details.fields.filters else []
-            }
-        }
-        explore_definition_json = json.dumps(explore_dict)
+            "joins": [_compact({"name": j.name, "type": j.type, "relationship": j.relationship, "sql_on": j.sql_on, "from": getattr(j, 'from_', None)}) for j in explore_details.joins or []],
+            "fields": _compact({
+                "dimensions": [_slim_field(f) for f in explore_details.fields.dimensions or []],
+                "measures": [_slim_field(f) for f in explore_details.fields.measures or []],
+                "filters": [_slim_field(f) for f in explore_details.fields.filters or []]
+            })
+        })
+        explore_definition_json = _dumps(explore_dict)
         # Log the full explore_dict for debugging
-        print("DEBUG: Looker explore_dict:", json.dumps(explore_dict, indent=2))
+        print("DEBUG: Looker explore_dict:", _dumps(explore_dict, orjson.OPT_INDENT_2))
         
-        # Get field usage history
-        history_scores = fetch_and_process_history(sdk, SOURCE_WEIGHTS, DEFAULT_WEIGHT)
         explore_usage_scores = history_scores.get(model_name, {}).get(explore_name, {})
         sorted_fields = sorted(explore_usage_scores.items(), key=lambda item: item[1], reverse=True)
         top_fields = [[field, round(score, 2)] for field, score in sorted_fields[:TOP_N_FIELDS]]
         
         # Generate analysis using Gemini
         prompt = generate_gemini_prompt(model_name, explore_name, explore_definition_json)
-        analysis = analyze_with_gemini(gemini_model, prompt, model_name, explore_name)
+        analysis = await analyze_with_gemini(gemini_model, prompt, model_name, explore_name, ANALYSIS_SYSTEM_INSTRUCTION)
         
         # Parse the analysis results
         result = {
@@ -414,28 +628,24 @@ def analyze_lookml(explore_name, model_name=None, user_description=None, common_
         # Try to parse structured sections if analysis was successful
         if not analysis.startswith("Error:"):
             try:
-                sections = analysis.split("###")
-                for section in sections:
-                    if section.strip().startswith("GRADE"):
-                        grade = int(section.split("\n")[1].strip())
-                        result["grade"] = grade
-                    elif section.strip().startswith("RATIONALE"):
-                        rationale = section.split("\n", 1)[1].strip()
-                        # Make rationale concise: use only the first sentence
-                        concise_rationale = rationale.split('. ')[0] + ('.' if '.' in rationale else '')
-                        result["rationale"] = concise_rationale
-                    elif section.strip().startswith("RECOMMENDATIONS"):
-                        recs = section.split("\n", 1)[1].strip()
-                        # Make recommendations short and actionable (first sentence or imperative phrase)
-                        short_recs = []
-                        for r in recs.split("\n"):
-                            r = r.strip().lstrip('0123456789. ')
-                            if r:
-                                short_recs.append(r.split('. ')[0] + ('.' if '.' in r else ''))
-                        result["recommendations"] = short_recs
-                    elif section.strip().startswith("GENERATED LOOKML SUGGESTIONS"):
-                        lookml = section.split("\n", 1)[1].strip()
-                        result["lookml_suggestions"] = lookml
+                sections = {m.group(1): m.group(2).strip() for m in _ANALYSIS_SECTION_RE.finditer(analysis)}
+                if "GRADE" in sections:
+                    result["grade"] = int(sections["GRADE"].split()[0])
+                if "RATIONALE" in sections:
+                    rationale = sections["RATIONALE"]
+                    # Make rationale concise: use only the first sentence
+                    concise_rationale = rationale.split('. ')[0] + ('.' if '.' in rationale else '')
+                    result["rationale"] = concise_rationale
+                if "RECOMMENDATIONS" in sections:
+                    # Make recommendations short and actionable (first sentence or imperative phrase)
+                    short_recs = []
+                    for r in sections["RECOMMENDATIONS"].split("\n"):
+                        r = r.strip().lstrip('0123456789. ')
+                        if r:
+                            short_recs.append(r.split('. ')[0] + ('.' if '.' in r else ''))
+                    result["recommendations"] = short_recs
+                if "GENERATED LOOKML SUGGESTIONS" in sections:
+                    result["lookml_suggestions"] = sections["GENERATED LOOKML SUGGESTIONS"]
                 # Generate additional content
                 result["agent_instructions"] = generate_agent_instructions(
                     top_fields,
@@ -463,7 +673,17 @@ def analyze_lookml(explore_name, model_name=None, user_description=None, common_
         }
         return error_result
 
-def summarize_recommendations_with_gemini(gemini_model, recommendations):
+def analyze_lookml(explore_name, model_name=None, user_description=None, common_questions=None, user_goals=None):
+    """Main function to analyze LookML for CA readiness."""
+    return run_async(analyze_lookml_async(
+        explore_name,
+        model_name=model_name,
+        user_description=user_description,
+        common_questions=common_questions,
+        user_goals=user_goals
+    ))
+
+async def summarize_recommendations_with_gemini(gemini_model, recommendations):
     prompt = (
         "Summarize the following recommendations for LookML improvements into a concise, actionable list. "
         "Group similar actions and focus on the most impactful changes. Use as few words as possible while preserving meaning.\n\n"
@@ -472,7 +692,7 @@ def summarize_recommendations_with_gemini(gemini_model, recommendations):
     for rec in recommendations:
         prompt += f"- {rec}\n"
     prompt += "\nSummarized Recommendations:"
-    summary = analyze_with_gemini(gemini_model, prompt, '', '')
+    summary = await analyze_with_gemini(gemini_model, prompt, '', '')
     # Extract the summary list (remove any extra text before/after)
     if isinstance(summary, str):
         lines = summary.strip().split('\n')
@@ -481,35 +701,196 @@ def summarize_recommendations_with_gemini(gemini_model, recommendations):
         return summary_lines
     return []
 
-def filter_recommendations_for_section(recommendations, section):
+def index_recommendations(recommendations):
+    """Pairs each recommendation with its lowercased text, computed once for all sections."""
+    return [(rec, rec.lower()) for rec in recommendations]
+
+def filter_recommendations_for_section(rec_index, section):
     section_lower = section.lower()
     # For 'explore', include general/explore-level recs
     if section_lower == 'explore':
-        return [rec for rec in recommendations if 'explore' in rec.lower() or 'join' in rec.lower() or 'all' in rec.lower()]
+        return [rec for rec, rec_lower in rec_index if 'explore' in rec_lower or 'join' in rec_lower or 'all' in rec_lower]
     # For a view, include recs that mention the view name or are general
-    return [rec for rec in recommendations if section_lower in rec.lower() or 'all' in rec.lower()]
-
-def filter_fields_for_section(weighted_fields, section):
+    return [rec for rec, rec_lower in rec_index if section_lower in rec_lower or 'all' in rec_lower]
+
+def index_fields_by_view(weighted_fields):
+    """Buckets weighted fields by lowercased view name, keeping their order.
+
+    Fields that look like joins or are not view-specific are also listed under None.
+    """
+    field_index = {None: []}
+    for f in weighted_fields:
+        view, dot, _ = f[0].partition('.')
+        if dot:
+            field_index.setdefault(view.lower(), []).append(f)
+        if not dot or 'join' in f[0].lower():
+            field_index[None].append(f)
+    return field_index
+
+def filter_fields_for_section(field_index, section):
     section_lower = section.lower()
     # For 'explore', include fields that look like joins or are not view-specific
     if section_lower == 'explore':
-        return [f for f in weighted_fields if '.' not in f[0] or 'join' in f[0].lower()]
+        return field_index[None]
     # For a view, include fields that start with the view name
-    return [f for f in weighted_fields if f[0].lower().startswith(section_lower + '.')]
+    return field_index.get(section_lower, [])
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+def filter_lookml_suggestions_for_section(lookml_suggestions, section):
+    if not lookml_suggestions or not isinstance(lookml_suggestions, str):
+        return ''
+    # Only include suggestions that mention the section name
+    section_lower = section.lower()
+    relevant_lines = [line for line in lookml_suggestions.split('\n') if section_lower in line.lower() or 'explore' in line.lower()]
+    return '\n'.join(relevant_lines)
+
+def build_section_prompt(model_name, explore_name, section, summarized_recs, filtered_fields, relevant_lookml_suggestions,
+                         user_description, common_questions, user_goals):
+    """Builds the LookML generation prompt for a single section (the explore or one view)."""
+    if section.lower() == 'explore':
+        prompt = f"""
+You are an expert LookML developer. Generate the LookML for the explore '{explore_name}' in model '{model_name}', implementing as many of the summarized recommendations as possible for Conversational Analytics readiness. Use the weighted fields to prioritize which joins or explore-level settings to improve. Use the user context to inform labels and descriptions. Output only the LookML code for the explore, ready to copy/paste into a LookML project.
+
+User Description: {user_description}
+Common Questions: {common_questions}
+User Goals: {user_goals}
+
+Weighted Fields (most important first): {filtered_fields}
+
+Summarized Recommendations:\n"""
+    else:
+        prompt = f"""
+You are an expert LookML developer. Generate a refinement block for the view '{section}' in model '{model_name}', including ONLY the relevant fields below. Implement as many of the summarized recommendations as possible for Conversational Analytics readiness. Use the weighted fields to prioritize which fields to improve. Use the user context to inform labels and descriptions.
+
+IMPORTANT RULES:
+1. Keep all synonyms within the description parameter, do not add a separate synonym parameter
+2. Only include the relevant fields listed below in the refinement
+3. Output only the LookML code for the refinement, ready to copy/paste into a LookML project.
+
+User Description: {user_description}
+Common Questions: {common_questions}
+User Goals: {user_goals}
+
+Relevant Fields (most important first): {filtered_fields}
+
+Summarized Recommendations:\n"""
+    for rec in summarized_recs:
+        prompt += f"- {rec}\n"
+    if relevant_lookml_suggestions:
+        prompt += f"\nRelevant LookML Suggestions:\n{relevant_lookml_suggestions}\n"
+    if section.lower() == 'explore':
+        prompt += "\nGenerate only the LookML code for this extends explore. Do not include other views or explores."
+    else:
+        prompt += "\nGenerate only the LookML code for this refinement. Do not include other views or explores."
+    return prompt
+
+def build_batch_prompt(section_prompts):
+    """Combines per-section prompts into one prompt whose output is split by section delimiters."""
+    prompt = (
+        "You will generate LookML for several sections in one response. Each section below has its own instructions.\n"
+        "Output the LookML for every section in the order given. Start each section's output with a line containing "
+        "exactly ===SECTION <name>=== (using the section name from its header) and output nothing else between sections.\n"
+    )
+    for section, section_prompt in section_prompts.items():
+        prompt += f"\n### SECTION: {section}\n{section_prompt.strip()}\n"
+    return prompt
+
+_BATCH_SECTION_RE = re.compile(r'^===SECTION (.+?)===[ \t]*$', re.MULTILINE)
+
+def split_batch_output(output):
+    """Splits batched Gemini output into a dict of section name to LookML code."""
+    matches = list(_BATCH_SECTION_RE.finditer(output))
+    sections = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(output)
+        sections[match.group(1).strip()] = output[match.end():end].strip()
+    return sections
+
+async def summarize_recommendations_for_sections(gemini_model, recommendations, sections):
+    """Summarizes the recommendations relevant to each section concurrently."""
+    rec_index = index_recommendations(recommendations)
+    summaries = await asyncio.gather(*(
+        summarize_recommendations_with_gemini(gemini_model, filter_recommendations_for_section(rec_index, section))
+        for section in sections
+    ))
+    return dict(zip(sections, summaries))
+
+def _sse_event(payload):
+    """Formats a payload as a server-sent event."""
+    return f"data: {_dumps(payload)}\n\n"
+
+def _find_line_overlap(prev_lines, new_lines, max_overlap=30):
+    """Returns how many leading new_lines repeat the trailing prev_lines.
+
+    Runs KMP over line hashes: the failure table of the new lines is matched
+    against the previous tail in one linear pass.
+    """
+    pattern = [hash(line) for line in new_lines[:max_overlap]]
+    text = [hash(line) for line in prev_lines[-max_overlap:]] if max_overlap else []
+    if not pattern or not text:
+        return 0
+
+    failure = [0] * len(pattern)
+    k = 0
+    for i in range(1, len(pattern)):
+        while k and pattern[i] != pattern[k]:
+            k = failure[k - 1]
+        if pattern[i] == pattern[k]:
+            k += 1
+        failure[i] = k
+
+    matched = 0
+    for line_hash in text:
+        while matched and (matched == len(pattern) or line_hash != pattern[matched]):
+            matched = failure[matched - 1]
+        if line_hash == pattern[matched]:
+            matched += 1
+
+    # Confirm against the actual lines in case of a hash collision
+    while matched and prev_lines[len(prev_lines) - matched:] != new_lines[:matched]:
+        matched = failure[matched - 1]
+    return matched
+
+async def _drop_repeated_lines(chunks, previous_output, max_overlap=30):
+    """Yields streamed chunks, dropping leading lines that repeat the end of previous_output."""
+    chunks = chunks.__aiter__()
+    buffered = ''
+    # Hold back output until enough complete lines have arrived to detect the overlap
+    async for chunk in chunks:
+        buffered += chunk
+        if buffered.count('\n') > max_overlap:
+            break
+
+    prev_lines = previous_output.strip().split('\n')
+    new_lines = buffered.lstrip().split('\n')
+    overlap = _find_line_overlap(prev_lines, new_lines[:max_overlap], max_overlap)
+    yield '\n'.join(new_lines[overlap:])
+    async for chunk in chunks:
+        yield chunk
+
+async def _is_preflight_request():
+    """CORS preflight requests do not count towards rate limits."""
+    return request.method == 'OPTIONS'
+
+async def _get_request_data():
+    """Returns the JSON object in the request body, or None if the body is not one."""
+    data = await request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*")
+rate_limiter = RateLimiter(app)
 
 @app.route('/generate_ca_lookml', methods=['POST', 'OPTIONS'])
-def generate_ca_lookml():
+@rate_limit(GENERATE_RATE_LIMIT, RATE_LIMIT_PERIOD, skip_function=_is_preflight_request)
+async def generate_ca_lookml():
     if request.method == 'OPTIONS':
         return '', 204
-    data = request.get_json()
+    data = await _get_request_data()
+    if data is None:
+        return jsonify({"error": "Request body must be a JSON object"}), 400
     model_name = data.get('model_name')
     explore_name = data.get('explore_name')
     section = data.get('section', 'explore')  # 'explore' or view name
-    MAX_RECOMMENDATIONS = 7
-    MAX_WEIGHTED_FIELDS = 10
     recommendations = data.get('recommendations', [])[:MAX_RECOMMENDATIONS]
     weighted_fields = data.get('weighted_fields', [])[:MAX_WEIGHTED_FIELDS]
     user_description = (data.get('user_description', '') or '')[:300]
@@ -520,25 +901,17 @@ def generate_ca_lookml():
     previous_output = data.get('previous_output', '')
     use_extends = data.get('use_extends', False)
 
-    looker_config = get_looker_config_from_secret_manager(LOOKER_PROJECT_ID, LOOKER_SECRET_NAME, LOOKER_SECRET_VERSION)
-    gemini_model = initialize_vertex_ai(VERTEX_PROJECT_ID, VERTEX_LOCATION)
+    gemini_model = await asyncio.to_thread(_get_gemini_model)
 
     # Filter recommendations and fields for this section
-    filtered_recs = filter_recommendations_for_section(recommendations, section)
-    filtered_fields = filter_fields_for_section(weighted_fields, section)
+    filtered_recs = filter_recommendations_for_section(index_recommendations(recommendations), section)
+    # For view generation, only weighted fields that belong to that view are sent
+    filtered_fields = filter_fields_for_section(index_fields_by_view(weighted_fields), section)
 
     # Filter lookml_suggestions for this section (if present)
-    lookml_suggestions = data.get('lookml_suggestions', '')
-    relevant_lookml_suggestions = ''
-    if lookml_suggestions and isinstance(lookml_suggestions, str):
-        # Only include suggestions that mention the section name
-        section_lower = section.lower()
-        relevant_lines = [line for line in lookml_suggestions.split('\n') if section_lower in line.lower() or 'explore' in line.lower()]
-        relevant_lookml_suggestions = '\n'.join(relevant_lines)
-
-    # For view generation, only send weighted fields that belong to that view
+    relevant_lookml_suggestions = filter_lookml_suggestions_for_section(data.get('lookml_suggestions', ''), section)
+
     if section.lower() != 'explore':
-        filtered_fields = [f for f in filtered_fields if f[0].lower().startswith(section.lower() + '.')]
         use_extends = False  # Use refinement for views
 
     if is_continue and previous_prompt and previous_output:
@@ -549,80 +922,121 @@ def generate_ca_lookml():
         )
     else:
         # Step 1: Summarize recommendations with Gemini
-        summarized_recs = summarize_recommendations_with_gemini(gemini_model, filtered_recs)
+        summarized_recs = await summarize_recommendations_with_gemini(gemini_model, filtered_recs)
         # Step 2: Use summary in LookML generation prompt
-        if section.lower() == 'explore':
-            prompt = f"""
-You are an expert LookML developer. Generate the LookML for the explore '{explore_name}' in model '{model_name}', implementing as many of the summarized recommendations as possible for Conversational Analytics readiness. Use the weighted fields to prioritize which joins or explore-level settings to improve. Use the user context to inform labels and descriptions. Output only the LookML code for the explore, ready to copy/paste into a LookML project.
-
-User Description: {user_description}
-Common Questions: {common_questions}
-User Goals: {user_goals}
-
-Weighted Fields (most important first): {filtered_fields}
-
-Summarized Recommendations:\n"""
-        else:
-            prompt = f"""
-You are an expert LookML developer. Generate a refinement block for the view '{section}' in model '{model_name}', including ONLY the relevant fields below. Implement as many of the summarized recommendations as possible for Conversational Analytics readiness. Use the weighted fields to prioritize which fields to improve. Use the user context to inform labels and descriptions.
-
-IMPORTANT RULES:
-1. Keep all synonyms within the description parameter, do not add a separate synonym parameter
-2. Only include the relevant fields listed below in the refinement
-3. Output only the LookML code for the refinement, ready to copy/paste into a LookML project.
-
-User Description: {user_description}
-Common Questions: {common_questions}
-User Goals: {user_goals}
-
-Relevant Fields (most important first): {filtered_fields}
+        prompt = build_section_prompt(
+            model_name, explore_name, section, summarized_recs, filtered_fields, relevant_lookml_suggestions,
+            user_description, common_questions, user_goals
+        )
 
-Summarized Recommendations:\n"""
-        for rec in summarized_recs:
-            prompt += f"- {rec}\n"
-        if relevant_lookml_suggestions:
-            prompt += f"\nRelevant LookML Suggestions:\n{relevant_lookml_suggestions}\n"
-        if section.lower() == 'explore':
-            prompt += "\nGenerate only the LookML code for this extends explore. Do not include other views or explores."
-        else:
-            prompt += "\nGenerate only the LookML code for this refinement. Do not include other views or explores."
-
-    lookml_code = analyze_with_gemini(gemini_model, prompt, model_name, explore_name)
-
-    # Post-process to remove duplicate lines at the join if this is a continue request
-    if is_continue and previous_output and isinstance(lookml_code, str):
-        prev_lines = previous_output.strip().split('\n')
-        new_lines = lookml_code.strip().split('\n')
-        max_overlap = min(30, len(prev_lines), len(new_lines))
-        overlap = 0
-        for i in range(max_overlap, 0, -1):
-            if prev_lines[-i:] == new_lines[:i]:
-                overlap = i
-                break
-        if overlap > 0:
-            lookml_code = '\n'.join(new_lines[overlap:])
-        lookml_code = previous_output + ('\n' if not previous_output.endswith('\n') else '') + lookml_code
-
-    is_truncated = False
-    if isinstance(lookml_code, str) and 'Warning: Response truncated (MAX_TOKENS)' in lookml_code:
-        is_truncated = True
+    async def generate():
+        chunks = analyze_with_gemini_stream(gemini_model, prompt, model_name, explore_name)
+        if is_continue and previous_output:
+            # Only the new code is streamed; the client appends it to previous_output
+            if not previous_output.endswith('\n'):
+                yield _sse_event({"ca_lookml_code": '\n'})
+            chunks = _drop_repeated_lines(chunks, previous_output)
+
+        is_truncated = False
+        async for chunk in chunks:
+            if 'Warning: Response truncated (MAX_TOKENS)' in chunk:
+                is_truncated = True
+            yield _sse_event({"ca_lookml_code": chunk})
+
+        yield _sse_event({
+            "done": True,
+            "is_truncated": is_truncated,
+            "prompt": prompt
+        })
+
+    return Response(generate(), mimetype='text/event-stream')
+
+@app.route('/generate_ca_lookml_batch', methods=['POST', 'OPTIONS'])
+@rate_limit(GENERATE_RATE_LIMIT, RATE_LIMIT_PERIOD, skip_function=_is_preflight_request)
+async def generate_ca_lookml_batch():
+    if request.method == 'OPTIONS':
+        return '', 204
+    data = await _get_request_data()
+    if data is None:
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    model_name = data.get('model_name')
+    explore_name = data.get('explore_name')
+    sections = data.get('sections') or ['explore']
+    recommendations = data.get('recommendations', [])[:MAX_RECOMMENDATIONS]
+    weighted_fields = data.get('weighted_fields', [])[:MAX_WEIGHTED_FIELDS]
+    user_description = (data.get('user_description', '') or '')[:300]
+    common_questions = (data.get('common_questions', '') or '')[:300]
+    user_goals = (data.get('user_goals', '') or '')[:300]
+    lookml_suggestions = data.get('lookml_suggestions', '')
 
+    gemini_model = await asyncio.to_thread(_get_gemini_model)
+
+    # Summarize each section's recommendations concurrently, then generate all sections in one call
+    summarized_recs = await summarize_recommendations_for_sections(gemini_model, recommendations, sections)
+    field_index = index_fields_by_view(weighted_fields)
+    section_prompts = {
+        section: build_section_prompt(
+            model_name, explore_name, section, summarized_recs[section],
+            filter_fields_for_section(field_index, section),
+            filter_lookml_suggestions_for_section(lookml_suggestions, section),
+            user_description, common_questions, user_goals
+        )
+        for section in sections
+    }
+    prompt = build_batch_prompt(section_prompts)
+    output = await analyze_with_gemini(gemini_model, prompt, model_name, explore_name)
+    generated = split_batch_output(output)
+    # Report a failed Gemini call instead of listing every section as missing, which
+    # would send the client into per-section retries against the same failure
+    if output.startswith("Error:") or not generated:
+        error = output if output.startswith("Error:") else "Error: Gemini output contained no LookML sections."
+        return jsonify({"error": error}), 502
+
+    # The last section produced is the one cut off when the response hit the token limit
+    truncated_section = None
+    if 'Warning: Response truncated (MAX_TOKENS)' in output and generated:
+        truncated_section = list(generated)[-1]
+
+    # Per-section prompts are returned so each section can be continued via /generate_ca_lookml
     return jsonify({
-        "ca_lookml_code": lookml_code,
-        "is_truncated": is_truncated,
-        "prompt": prompt
+        "sections": {
+            section: {
+                "ca_lookml_code": code,
+                "is_truncated": section == truncated_section,
+                "prompt": section_prompts[section]
+            }
+            for section, code in generated.items() if section in section_prompts
+        },
+        "missing_sections": [section for section in sections if section not in generated]
     })
 
 @app.route('/analyze', methods=['POST', 'OPTIONS'])
-def analyze():
+@rate_limit(ANALYZE_RATE_LIMIT, RATE_LIMIT_PERIOD, skip_function=_is_preflight_request)
+async def analyze():
     if request.method == 'OPTIONS':
         return '', 204
-    data = request.get_json()
-    result = analyze_lookml(
+    data = await _get_request_data()
+    if data is None:
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    result = await analyze_lookml_async(
         explore_name=data.get('explore_name'),
         model_name=data.get('model_name'),
         user_description=data.get('user_description'),
         common_questions=data.get('common_questions'),
         user_goals=data.get('user_goals')
     )
-    return jsonify(result) 
\ No newline at end of file
+    return jsonify(result) 
+
+def _is_admin_request():
+    """Checks the X-Admin-Token header against ADMIN_TOKEN."""
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+@app.route('/admin/clear_history_cache', methods=['POST'])
+@rate_limit(ADMIN_RATE_LIMIT, RATE_LIMIT_PERIOD)
+@cors_exempt
+async def admin_clear_history_cache():
+    if not _is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    clear_history_cache()
+    return jsonify({"status": "success"})
@@ -1,40 +1,94 @@
-import flask
-import functions_framework
-from looker_ca_analyzer import analyze_lookml
+import hashlib
+import threading
+import cachetools
+import fastjsonschema
+import orjson
+from functions_framework import aio
+from starlette.requests import Request
+from starlette.responses import Response
+from looker_ca_analyzer import analyze_lookml_async
 
-@functions_framework.http
-def hello(request: flask.Request) -> flask.typing.ResponseReturnValue:
+ANALYSIS_CACHE_SIZE = 256
+ANALYSIS_CACHE_TTL_SECONDS = 300
+
+# Request body schema, compiled once into a validation function at import
+_validate_request = fastjsonschema.compile({
+    "type": "object",
+    "required": ["model_name", "explore_name"],
+    "properties": {
+        "model_name": {"type": "string", "minLength": 1},
+        "explore_name": {"type": "string", "minLength": 1},
+        "user_description": {"type": ["string", "null"]},
+        "common_questions": {"type": ["string", "null"]},
+        "user_goals": {"type": ["string", "null"]}
+    }
+})
+
+# Serialized bodies of recent analysis results, reused while a warm instance serves repeat requests
+_analysis_cache = cachetools.TTLCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL_SECONDS)
+_analysis_cache_lock = threading.Lock()
+
+def _json_response(body, status_code=200):
+    """Wraps a payload, or JSON bytes already serialized with orjson, in a JSON response."""
+    if not isinstance(body, bytes):
+        body = orjson.dumps(body)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+def _analysis_cache_key(model_name, explore_name, user_description, common_questions, user_goals):
+    """Builds the cache key for an analysis request, hashing the free-text user context."""
+    user_context = "\x1f".join(str(v or "") for v in (user_description, common_questions, user_goals))
+    return (model_name, explore_name, hashlib.blake2b(user_context.encode()).digest())
+
+@aio.http
+async def hello(request: Request) -> aio.HTTPResponse:
     """HTTP Cloud Function that analyzes Looker LookML for Conversational Analytics readiness.
     
+    Served as an ASGI function so the Looker and Gemini calls are awaited
+    on the server's event loop instead of blocking a worker thread.
+    
     Args:
-        request (flask.Request): The request object.
+        request (starlette.requests.Request): The request object.
         {
             "model_name": "your_model_name",
             "explore_name": "your_explore_name",
-            "user_description": "your_user_description",
-            "common_questions": "your_common_questions",
-            "user_goals": "your_user_goals"
+            "user_description": "your_user_description",  # optional
+            "common_questions": "your_common_questions",  # optional
+            "user_goals": "your_user_goals"  # optional
         }
     Returns:
         Analysis results as JSON
     """
     # Get parameters from request
-    request_json = request.get_json(silent=True)
+    try:
+        raw_body = await request.body()
+        request_json = orjson.loads(raw_body) if raw_body else None
+    except orjson.JSONDecodeError:
+        request_json = None
     
     if not request_json:
-        return {"error": "No JSON data in request"}, 400
+        return _json_response({"error": "No JSON data in request"}, 400)
+    
+    try:
+        _validate_request(request_json)
+    except fastjsonschema.JsonSchemaValueException as e:
+        if e.rule in ("required", "minLength"):
+            return _json_response({"error": "Missing required parameters: model_name and explore_name"}, 400)
+        return _json_response({"error": f"Invalid request: {e.message}"}, 400)
         
-    model_name = request_json.get("model_name")
-    explore_name = request_json.get("explore_name")
+    model_name = request_json["model_name"]
+    explore_name = request_json["explore_name"]
     user_description = request_json.get("user_description")
     common_questions = request_json.get("common_questions")
     user_goals = request_json.get("user_goals")
     
-    if not model_name or not explore_name:
-        return {"error": "Missing required parameters: model_name and explore_name"}, 400
+    cache_key = _analysis_cache_key(model_name, explore_name, user_description, common_questions, user_goals)
+    with _analysis_cache_lock:
+        cached_body = _analysis_cache.get(cache_key)
+    if cached_body is not None:
+        return _json_response(cached_body)
     
     # Analyze the LookML
-    result = analyze_lookml(
+    result = await analyze_lookml_async(
         explore_name=explore_name,
         model_name=model_name,
         user_description=user_description,
@@ -42,4 +96,12 @@ def hello(request: flask.Request) -> flask.typing.ResponseReturnValue:
         user_goals=user_goals
     )
     
-    return result 
\ No newline at end of file
+    body = orjson.dumps(result)
+    # Only successful analyses are cached so failures are retried on the next request.
+    # Gemini failures still report status "success", with the error in raw_analysis.
+    gemini_failed = (result.get("raw_analysis") or "").startswith("Error:")
+    if result.get("status") == "success" and not gemini_failed:
+        with _analysis_cache_lock:
+            _analysis_cache[cache_key] = body
+    
+    return _json_response(body) 
\ No newline at end of file
@@ -1,4 +1,9 @@
-from looker_ca_analyzer import app
+import os
+import uvicorn
 
 if __name__ == "__main__":
-    app.run(port=8082) 
\ No newline at end of file
+    # Rate limits and the history cache (including /admin/clear_history_cache) are kept
+    # per process, so they only hold app-wide with a single worker. Raising
+    # WEB_CONCURRENCY for load testing multiplies the effective limits by the worker count.
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run("looker_ca_analyzer:app", port=8082, workers=workers, loop="auto")
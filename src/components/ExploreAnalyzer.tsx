@@ -41,6 +41,52 @@ interface AnalysisResult {
   user_goals: string
 }
 
+interface CaLookmlStreamResult {
+  code: string
+  isTruncated: boolean
+  prompt: string | null
+}
+
+// Streams generated LookML from the backend as server-sent events, calling
+// onCode with the accumulated code as each chunk arrives.
+const streamCaLookml = async (
+  payload: Record<string, unknown>,
+  onCode: (code: string) => void
+): Promise<CaLookmlStreamResult> => {
+  const response = await fetch('http://localhost:8082/generate_ca_lookml', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload)
+  })
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP error! status: ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  const result: CaLookmlStreamResult = { code: '', isTruncated: false, prompt: null }
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const events = buffer.split('\n\n')
+    buffer = events.pop() || ''
+    for (const event of events) {
+      if (!event.startsWith('data: ')) continue
+      const data = JSON.parse(event.slice('data: '.length))
+      if (data.done) {
+        result.isTruncated = data.is_truncated
+        result.prompt = data.prompt
+      } else {
+        result.code += data.ca_lookml_code
+        onCode(result.code)
+      }
+    }
+  }
+  return result
+}
+
 export const ExploreAnalyzer: React.FC = () => {
   const [selectedExplore, setSelectedExplore] = useState('')
   const [selectedFields, setSelectedFields] = useState<string[]>([])
@@ -199,22 +245,17 @@ export const ExploreAnalyzer: React.FC = () => {
     setIsGeneratingLookml(true)
     setCopySuccess(false)
     try {
-      const response = await fetch('http://localhost:8082/generate_ca_lookml', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          model_name: analysisResult.model_name,
-          explore_name: analysisResult.explore_name,
-          recommendations: analysisResult.recommendations,
-          weighted_fields: analysisResult.top_used_fields,
-          user_description: userDescription,
-          common_questions: commonQuestions,
-          user_goals: userGoals,
-        })
-      })
-      const data = await response.json()
-      setCaLookmlCode(data.ca_lookml_code)
-      setIsTruncated(data.is_truncated)
+      const data = await streamCaLookml({
+        model_name: analysisResult.model_name,
+        explore_name: analysisResult.explore_name,
+        recommendations: analysisResult.recommendations,
+        weighted_fields: analysisResult.top_used_fields,
+        user_description: userDescription,
+        common_questions: commonQuestions,
+        user_goals: userGoals,
+      }, setCaLookmlCode)
+      setCaLookmlCode(data.code)
+      setIsTruncated(data.isTruncated)
       setLastPrompt(data.prompt)
     } catch (err) {
       setCaLookmlCode('Error generating LookML. Please try again.')
@@ -229,18 +270,13 @@ export const ExploreAnalyzer: React.FC = () => {
     setIsContinuing(true)
     setCopySuccess(false)
     try {
-      const response = await fetch('http://localhost:8082/generate_ca_lookml', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          continue: true,
-          previous_prompt: lastPrompt,
-          previous_output: caLookmlCode,
-        })
-      })
-      const data = await response.json()
-      setCaLookmlCode(caLookmlCode + (data.ca_lookml_code || ''))
-      setIsTruncated(data.is_truncated)
+      const data = await streamCaLookml({
+        continue: true,
+        previous_prompt: lastPrompt,
+        previous_output: caLookmlCode,
+      }, code => setCaLookmlCode(caLookmlCode + code))
+      setCaLookmlCode(caLookmlCode + data.code)
+      setIsTruncated(data.isTruncated)
       setLastPrompt(data.prompt)
     } catch (err) {
       // Optionally show an error
@@ -304,9 +340,58 @@ export const ExploreAnalyzer: React.FC = () => {
     setCurrentSectionIndex(0)
     setSectionOutputs({})
 
-    for (let i = 0; i < selectedSectionsArray.length; i++) {
+    // Generate all selected sections in a single request; any section the
+    // batch response did not include falls back to a per-section request.
+    let remainingSections = selectedSectionsArray
+    try {
+      const response = await fetch('http://localhost:8082/generate_ca_lookml_batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          model_name: analysisResult.model_name,
+          explore_name: analysisResult.explore_name,
+          recommendations: analysisResult.recommendations,
+          weighted_fields: analysisResult.top_used_fields,
+          user_description: userDescription,
+          common_questions: commonQuestions,
+          user_goals: userGoals,
+          sections: selectedSectionsArray,
+          use_extends: useExtends,
+        })
+      })
+      if (response.status === 502) {
+        // Gemini failed for the whole batch; per-section requests would hit the same failure
+        const data = await response.json()
+        setError(data.error || 'LookML generation failed. Please try again.')
+        setIsGeneratingSequentially(false)
+        setCurrentSectionIndex(0)
+        return
+      }
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+      const data = await response.json()
+      console.log('[LookML Generation] Received batch response:', data)
+      const batchOutputs: typeof sectionOutputs = {}
+      Object.entries(data.sections as { [section: string]: any }).forEach(([section, output]) => {
+        batchOutputs[section] = {
+          code: output.ca_lookml_code,
+          isLoading: false,
+          isTruncated: output.is_truncated,
+          lastPrompt: output.prompt,
+          isContinuing: false,
+          copySuccess: false,
+        }
+      })
+      setSectionOutputs(batchOutputs)
+      remainingSections = data.missing_sections
+    } catch (err) {
+      console.error('[LookML Generation] Batch error:', err)
+    }
+
+    for (let i = 0; i < remainingSections.length; i++) {
       setCurrentSectionIndex(i)
-      await handleGenerateSectionLookml(selectedSectionsArray[i])
+      await handleGenerateSectionLookml(remainingSections[i])
     }
 
     setIsGeneratingSequentially(false)
@@ -319,6 +404,7 @@ export const ExploreAnalyzer: React.FC = () => {
       ...prev,
       [section]: {
         ...(prev[section] || {}),
+        code: null,
         isLoading: true,
         isTruncated: false,
         lastPrompt: null,
@@ -339,19 +425,22 @@ export const ExploreAnalyzer: React.FC = () => {
         use_extends: useExtends,
       }
       console.log('[LookML Generation] Sending payload:', payload)
-      const response = await fetch('http://localhost:8082/generate_ca_lookml', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload)
+      const data = await streamCaLookml(payload, code => {
+        setSectionOutputs(prev => ({
+          ...prev,
+          [section]: {
+            ...prev[section],
+            code,
+          }
+        }))
       })
-      const data = await response.json()
       console.log('[LookML Generation] Received response:', data)
       setSectionOutputs(prev => ({
         ...prev,
         [section]: {
-          code: data.ca_lookml_code,
+          code: data.code,
           isLoading: false,
-          isTruncated: data.is_truncated,
+          isTruncated: data.isTruncated,
           lastPrompt: data.prompt,
           isContinuing: false,
           copySuccess: false,
@@ -385,22 +474,25 @@ export const ExploreAnalyzer: React.FC = () => {
       }
     }))
     try {
-      const response = await fetch('http://localhost:8082/generate_ca_lookml', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          continue: true,
-          previous_prompt: sectionState.lastPrompt,
-          previous_output: sectionState.code,
-        })
+      const data = await streamCaLookml({
+        continue: true,
+        previous_prompt: sectionState.lastPrompt,
+        previous_output: sectionState.code,
+      }, code => {
+        setSectionOutputs(prev => ({
+          ...prev,
+          [section]: {
+            ...prev[section],
+            code: sectionState.code + code,
+          }
+        }))
       })
-      const data = await response.json()
       setSectionOutputs(prev => ({
         ...prev,
         [section]: {
           ...sectionState,
-          code: sectionState.code + (data.ca_lookml_code || ''),
-          isTruncated: data.is_truncated,
+          code: sectionState.code + data.code,
+          isTruncated: data.isTruncated,
           lastPrompt: data.prompt,
           isContinuing: false,
           copySuccess: false,
@@ -581,7 +673,7 @@ export const ExploreAnalyzer: React.FC = () => {
                   <Card key={section}>
                     <SpaceVertical gap="small">
                       <Heading as="h4">{section}</Heading>
-                      {state.isLoading ? (
+                      {state.isLoading && !state.code ? (
                         <Spinner />
                       ) : state.code ? (
                         <>
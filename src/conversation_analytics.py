@@ -10,22 +10,65 @@ It evaluates various aspects of the Explore including:
 - Time-based analysis capabilities
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import logging
+import re
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
+from functools import cached_property, lru_cache
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Handlers and levels are left to the host application that imports this module
 logger = logging.getLogger(__name__)
 
-class AnalysisStatus(Enum):
-    """Status of the analysis for a specific aspect."""
-    PASS = "PASS"
-    WARNING = "WARNING"
-    FAIL = "FAIL"
+# Dimensions every CA-ready Explore must expose, in the order they are reported
+_REQUIRED_ORDER = ('date', 'user_id', 'session_id')
+REQUIRED_DIMENSIONS = frozenset(_REQUIRED_ORDER)
+# Matches measure names that look like basic metrics
+_BASIC_METRIC_RE = re.compile(r'count|sum|average', re.IGNORECASE)
+# Basic metrics an Explore needs for sufficient measure coverage
+MIN_BASIC_METRICS = 2
 
-@dataclass
+class AnalysisStatus(IntEnum):
+    """Status of the analysis for a specific aspect; the integer value doubles as its tally index."""
+    PASS = 0
+    WARNING = 1
+    FAIL = 2
+    
+    @property
+    def label(self) -> str:
+        """The status name used when serializing results, e.g. "PASS"."""
+        return self.name
+
+# Result counts from which get_summary tallies statuses with Numba, when it is installed;
+# below this the JIT dispatch costs more than a Python loop
+JIT_TALLY_MIN_RESULTS = 64
+
+@lru_cache(maxsize=None)
+def _jit_tally():
+    """Compile the status tally with Numba on first use; None when Numba is not installed."""
+    try:
+        import numpy as np
+        from numba import njit
+    except ImportError:
+        return None
+    
+    @njit(cache=True)
+    def tally(codes, n_statuses):
+        return np.bincount(codes, minlength=n_statuses)
+    
+    return lambda codes: tally(np.asarray(codes, dtype=np.int8), len(AnalysisStatus)).tolist()
+
+def _tally_statuses(codes: List[int]) -> List[int]:
+    """Count results per status code."""
+    tally = _jit_tally() if len(codes) >= JIT_TALLY_MIN_RESULTS else None
+    if tally is not None:
+        return tally(codes)
+    counts = [0] * len(AnalysisStatus)
+    for code in codes:
+        counts[code] += 1
+    return counts
+
+@dataclass(slots=True, frozen=True)
 class AnalysisResult:
     """Result of analyzing a specific aspect of the Explore."""
     status: AnalysisStatus
@@ -35,6 +78,9 @@ class AnalysisResult:
 class ConversationAnalyticsAnalyzer:
     """Main class for analyzing Looker Explores for Conversational Analytics readiness."""
     
+    # Aspects analyzed by run_analysis, each checked by the matching analyze_<aspect> method
+    _ASPECTS = ('dimensions', 'measures', 'joins', 'time_dimensions')
+    
     def __init__(self, explore_data: Dict[str, Any]):
         """
         Initialize the analyzer with Explore data.
@@ -44,6 +90,26 @@ class ConversationAnalyticsAnalyzer:
         """
         self.explore_data = explore_data
         self.results: Dict[str, AnalysisResult] = {}
+        self._summary: Optional[Dict[str, Any]] = None
+    
+    @cached_property
+    def _dimension_stats(self) -> Tuple[List[str], Dict[Optional[str], List[Dict[str, Any]]]]:
+        """Walk the dimensions once, returning the missing required names and the dimensions bucketed by type."""
+        present = set()
+        dims_by_type = {}
+        for d in self.explore_data.get('dimensions', []):
+            present.add(d.get('name'))
+            dims_by_type.setdefault(d.get('type'), []).append(d)
+        missing = REQUIRED_DIMENSIONS - present
+        return [dim for dim in _REQUIRED_ORDER if dim in missing], dims_by_type
+    
+    @cached_property
+    def _joins_by_type(self) -> Dict[Optional[str], List[Dict[str, Any]]]:
+        """Joins bucketed by their type, built on first access."""
+        joins_by_type = {}
+        for j in self.explore_data.get('joins', []):
+            joins_by_type.setdefault(j.get('type'), []).append(j)
+        return joins_by_type
     
     def analyze_dimensions(self) -> AnalysisResult:
         """Analyze the dimensions in the Explore."""
@@ -55,9 +121,7 @@ class ConversationAnalyticsAnalyzer:
             )
         
         # Check for required dimensions
-        required_dimensions = ['date', 'user_id', 'session_id']
-        missing_dimensions = [dim for dim in required_dimensions 
-                            if not any(d['name'] == dim for d in dimensions)]
+        missing_dimensions, _ = self._dimension_stats
         
         if missing_dimensions:
             return AnalysisResult(
@@ -80,12 +144,15 @@ class ConversationAnalyticsAnalyzer:
                 message="No measures found in the Explore"
             )
         
-        # Check for basic metrics
-        basic_metrics = ['count', 'sum', 'average']
-        metric_coverage = sum(1 for m in measures 
-                            if any(bm in m['name'].lower() for bm in basic_metrics))
+        # Check for basic metrics, stopping as soon as enough are found
+        metric_coverage = 0
+        for m in measures:
+            if _BASIC_METRIC_RE.search(m['name']):
+                metric_coverage += 1
+                if metric_coverage >= MIN_BASIC_METRICS:
+                    break
         
-        if metric_coverage < 2:
+        if metric_coverage < MIN_BASIC_METRICS:
             return AnalysisResult(
                 status=AnalysisStatus.WARNING,
                 message="Limited metric coverage detected"
@@ -107,7 +174,7 @@ class ConversationAnalyticsAnalyzer:
             )
         
         # Check for proper join relationships
-        has_primary_join = any(j.get('type') == 'left_outer' for j in joins)
+        has_primary_join = 'left_outer' in self._joins_by_type
         if not has_primary_join:
             return AnalysisResult(
                 status=AnalysisStatus.WARNING,
@@ -122,8 +189,8 @@ class ConversationAnalyticsAnalyzer:
     
     def analyze_time_dimensions(self) -> AnalysisResult:
         """Analyze time-based dimensions in the Explore."""
-        dimensions = self.explore_data.get('dimensions', [])
-        time_dimensions = [d for d in dimensions if d.get('type') == 'time']
+        _, dims_by_type = self._dimension_stats
+        time_dimensions = dims_by_type.get('time', ())
         
         if not time_dimensions:
             return AnalysisResult(
@@ -139,43 +206,40 @@ class ConversationAnalyticsAnalyzer:
     
     def run_analysis(self) -> Dict[str, AnalysisResult]:
         """Run the complete analysis of the Explore."""
-        analysis_methods = [
-            ('dimensions', self.analyze_dimensions),
-            ('measures', self.analyze_measures),
-            ('joins', self.analyze_joins),
-            ('time_dimensions', self.analyze_time_dimensions)
-        ]
-        
-        for aspect, method in analysis_methods:
+        results = {}
+        for aspect in self._ASPECTS:
             try:
-                self.results[aspect] = method()
+                results[aspect] = getattr(self, 'analyze_' + aspect)()
             except Exception as e:
                 logger.error(f"Error analyzing {aspect}: {str(e)}")
-                self.results[aspect] = AnalysisResult(
+                results[aspect] = AnalysisResult(
                     status=AnalysisStatus.FAIL,
                     message=f"Error during analysis: {str(e)}"
                 )
         
+        self.results = results
+        self._summary = None
         return self.results
     
     def get_summary(self) -> Dict[str, Any]:
-        """Get a summary of the analysis results."""
+        """Get a summary of the analysis results, computed once per analysis run."""
+        if self._summary is not None:
+            return self._summary
         if not self.results:
             self.run_analysis()
         
-        total_aspects = len(self.results)
-        passed_aspects = sum(1 for r in self.results.values() 
-                           if r.status == AnalysisStatus.PASS)
-        failed_aspects = sum(1 for r in self.results.values() 
-                           if r.status == AnalysisStatus.FAIL)
+        counts = _tally_statuses([int(v.status) for v in self.results.values()])
+        details = {k: {'status': v.status.label, 'message': v.message} 
+                   for k, v in self.results.items()}
         
-        return {
-            'total_aspects': total_aspects,
-            'passed_aspects': passed_aspects,
+        failed_aspects = counts[AnalysisStatus.FAIL]
+        self._summary = {
+            'total_aspects': len(self.results),
+            'passed_aspects': counts[AnalysisStatus.PASS],
             'failed_aspects': failed_aspects,
-            'warning_aspects': total_aspects - passed_aspects - failed_aspects,
-            'overall_status': AnalysisStatus.PASS if failed_aspects == 0 
-                            else AnalysisStatus.FAIL,
-            'details': {k: {'status': v.status.value, 'message': v.message} 
-                       for k, v in self.results.items()}
-        } 
\ No newline at end of file
+            'warning_aspects': counts[AnalysisStatus.WARNING],
+            'overall_status': (AnalysisStatus.PASS if failed_aspects == 0 
+                               else AnalysisStatus.FAIL).label,
+            'details': details
+        }
+        return self._summary 
\ No newline at end of file
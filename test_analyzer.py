@@ -1,7 +1,52 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from looker_ca_analyzer import analyze_lookml
 
+MAX_WORKERS = 8
+
+def run_test_case(test_case):
+    """Analyzes one test case and returns its report as text."""
+    lines = []
+    log = lines.append
+    log(f"\nTesting with model: {test_case['model_name']}, explore: {test_case['explore_name']}")
+    log("=" * 50)
+    
+    try:
+        result = analyze_lookml(
+            explore_name=test_case['explore_name'],
+            model_name=test_case['model_name']
+        )
+        
+        # Print the results in a readable format
+        log("\nAnalysis Results:")
+        log("-" * 30)
+        log(f"Status: {result.get('status', 'unknown')}")
+        
+        if result.get('status') == 'success':
+            log(f"\nGrade: {result.get('grade', 'N/A')}")
+            log(f"\nRationale: {result.get('rationale', 'N/A')}")
+            
+            log("\nTop Used Fields:")
+            for field, score in result.get('top_used_fields', []):
+                log(f"- {field}: {score}")
+            
+            log("\nRecommendations:")
+            for i, rec in enumerate(result.get('recommendations', []), 1):
+                log(f"{i}. {rec}")
+            
+            log("\nAgent Instructions:")
+            for i, instr in enumerate(result.get('agent_instructions', []), 1):
+                log(f"{i}. {instr}")
+        else:
+            log(f"Error: {result.get('error', 'Unknown error')}")
+            
+    except Exception as e:
+        log(f"Error during analysis: {str(e)}")
+    
+    log("\n" + "=" * 50)
+    return "\n".join(lines)
+
 def test_analyzer():
     # Set the path to your looker.ini file
     os.environ['LOOKER_INI_PATH'] = 'looker.ini'
@@ -15,43 +60,11 @@ def test_analyzer():
         # Add more test cases as needed
     ]
     
-    for test_case in test_cases:
-        print(f"\nTesting with model: {test_case['model_name']}, explore: {test_case['explore_name']}")
-        print("=" * 50)
-        
-        try:
-            result = analyze_lookml(
-                explore_name=test_case['explore_name'],
-                model_name=test_case['model_name']
-            )
-            
-            # Print the results in a readable format
-            print("\nAnalysis Results:")
-            print("-" * 30)
-            print(f"Status: {result.get('status', 'unknown')}")
-            
-            if result.get('status') == 'success':
-                print(f"\nGrade: {result.get('grade', 'N/A')}")
-                print(f"\nRationale: {result.get('rationale', 'N/A')}")
-                
-                print("\nTop Used Fields:")
-                for field, score in result.get('top_used_fields', []):
-                    print(f"- {field}: {score}")
-                
-                print("\nRecommendations:")
-                for i, rec in enumerate(result.get('recommendations', []), 1):
-                    print(f"{i}. {rec}")
-                
-                print("\nAgent Instructions:")
-                for i, instr in enumerate(result.get('agent_instructions', []), 1):
-                    print(f"{i}. {instr}")
-            else:
-                print(f"Error: {result.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            print(f"Error during analysis: {str(e)}")
-        
-        print("\n" + "=" * 50)
+    # Cases run concurrently; each returns its report instead of printing, so reports
+    # are printed whole and in case order rather than interleaved
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for report in executor.map(run_test_case, test_cases):
+            print(report)
 
 if __name__ == "__main__":
-    test_analyzer() 
\ No newline at end of file
+    test_analyzer()
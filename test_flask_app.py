@@ -1,7 +1,22 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared session so keep-alive connections are reused across test requests
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+MAX_WORKERS = 8
 
 def test_analyze_explore(model_name, explore_name):
+    """Posts one analyze request and returns its report as text."""
+    lines = []
+    log = lines.append
     url = "http://localhost:8080/analyze"
     
     payload = {
@@ -12,48 +27,49 @@ def test_analyze_explore(model_name, explore_name):
         "Content-Type": "application/json"
     }
     
-    print(f"\nTesting analyze endpoint with {model_name}/{explore_name}")
-    print("=" * 50)
+    log(f"\nTesting analyze endpoint with {model_name}/{explore_name}")
+    log("=" * 50)
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = SESSION.post(url, json=payload, headers=headers)
         
-        print(f"Status Code: {response.status_code}")
+        log(f"Status Code: {response.status_code}")
         
         if response.status_code == 200:
             result = response.json()
             
-            print("\nAnalysis Results:")
-            print("-" * 30)
-            print(f"Status: {result.get('status', 'unknown')}")
+            log("\nAnalysis Results:")
+            log("-" * 30)
+            log(f"Status: {result.get('status', 'unknown')}")
             
             if result.get('status') == 'success':
-                print(f"\nGrade: {result.get('grade', 'N/A')}")
-                print(f"\nRationale: {result.get('rationale', 'N/A')}")
+                log(f"\nGrade: {result.get('grade', 'N/A')}")
+                log(f"\nRationale: {result.get('rationale', 'N/A')}")
                 
-                print("\nTop Used Fields:")
+                log("\nTop Used Fields:")
                 for field, score in result.get('top_used_fields', []):
-                    print(f"- {field}: {score}")
+                    log(f"- {field}: {score}")
                 
-                print("\nRecommendations:")
+                log("\nRecommendations:")
                 for i, rec in enumerate(result.get('recommendations', []), 1):
-                    print(f"{i}. {rec}")
+                    log(f"{i}. {rec}")
                 
-                print("\nAgent Instructions:")
+                log("\nAgent Instructions:")
                 for i, instr in enumerate(result.get('agent_instructions', []), 1):
-                    print(f"{i}. {instr}")
+                    log(f"{i}. {instr}")
             else:
-                print(f"Error: {result.get('error', 'Unknown error')}")
+                log(f"Error: {result.get('error', 'Unknown error')}")
                 if 'traceback' in result:
-                    print("\nTraceback:")
-                    print(result['traceback'])
+                    log("\nTraceback:")
+                    log(result['traceback'])
         else:
-            print(f"Error: {response.text}")
+            log(f"Error: {response.text}")
             
     except Exception as e:
-        print(f"Error making request: {str(e)}")
+        log(f"Error making request: {str(e)}")
     
-    print("\n" + "=" * 50)
+    log("\n" + "=" * 50)
+    return "\n".join(lines)
 
 if __name__ == "__main__":
     # Test cases
@@ -65,5 +81,8 @@ if __name__ == "__main__":
         # Add more test cases as needed
     ]
     
-    for test_case in test_cases:
-        test_analyze_explore(test_case["model_name"], test_case["explore_name"]) 
\ No newline at end of file
+    # Same concurrent runner as test_analyzer.py
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        reports = executor.map(lambda tc: test_analyze_explore(tc["model_name"], tc["explore_name"]), test_cases)
+        for report in reports:
+            print(report)